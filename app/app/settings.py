@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -77,6 +78,9 @@ TEMPLATES = [
 WSGI_APPLICATION = 'app.wsgi.application'
 
 
+TESTING = 'test' in sys.argv
+
+
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
@@ -90,6 +94,18 @@ DATABASES = {
     }
 }
 
+# Tests run against Postgres like production. Set TEST_DB_SQLITE=1 to run
+# them against an in-memory SQLite database instead for quicker local runs;
+# that skips any Postgres-specific behaviour, so CI keeps using Postgres.
+
+if TESTING and os.environ.get('TEST_DB_SQLITE') == '1':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -109,6 +125,15 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# The default PBKDF2 hasher dominates the runtime of tests that create
+# users, so swap in a fast hasher while running the test suite.
+# https://docs.djangoproject.com/en/3.2/topics/testing/overview/#password-hashing
+
+if TESTING:
+    PASSWORD_HASHERS = [
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -140,6 +165,20 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Remember successful token logins for a short time so repeat logins skip
+# the password hash check. Off by default.
+
+AUTH_CACHE_ENABLED = False
+AUTH_CACHE_TIMEOUT = 60
+
+# Let CachedTokenAuthentication keep token lookups for a short time. Off by
+# default. Entries are cleared when a token is deleted or its user is saved,
+# which only reaches every worker through a shared cache backend such as
+# Redis or Memcached, so configure CACHES accordingly before enabling it.
+
+TOKEN_CACHE_ENABLED = False
+TOKEN_CACHE_TIMEOUT = 30
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 
@@ -13,6 +13,10 @@ def create_user(email='test@example.com',password='testpass123'):
 class ModelTests(TestCase):
     """Test models"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(email='user@example.com')
+
     def test_create_user_with_email_successful(self):
         """Test creating user with an email is successful"""
         email = "test@example.com"
@@ -36,15 +40,13 @@ class ModelTests(TestCase):
         ]
 
         for email, expected in sample_email:
-            user = get_user_model().objects.create_user(email, 'sample123pass')
+            with self.subTest(email=email):
+                user = get_user_model().objects.create_user(
+                    email,
+                    'sample123pass'
+                )
 
-            self.assertEqual(user.email, expected)
-
-    def test_new_user_without_email_raise_error(self):
-        """Test creating new user without email raise error."""
-
-        with self.assertRaises(ValueError):
-            get_user_model().objects.create_user('', 'test123pass')
+                self.assertEqual(user.email, expected)
 
     def test_create_superuser(self):
         """Test creating superuser"""
@@ -60,10 +62,8 @@ class ModelTests(TestCase):
     def test_create_recipe_success(self):
         """Test create receipe successfully."""
 
-        user = create_user()
-
         recipe = models.Recipe.objects.create(
-            user=user,
+            user=self.user,
             title="Sample title",
             time_minutes=5,
             price=Decimal('5.50'),
@@ -75,10 +75,8 @@ class ModelTests(TestCase):
     def test_create_tag(self):
         """Test tag create successfully."""
 
-        user = create_user()
-
         tag = models.Tag.objects.create(
-            user=user,
+            user=self.user,
             name='Sample Tag'
         )
 
@@ -86,14 +84,23 @@ class ModelTests(TestCase):
 
     def test_create_ingredient(self):
         """Test creating an ingredient is successful."""
-        user = create_user()
         ingredient = models.Ingredient.objects.create(
-            user=user,
+            user=self.user,
             name='Ingredient1'
         )
 
         self.assertEqual(str(ingredient), ingredient.name)
 
+
+class ModelPureTests(SimpleTestCase):
+    """Test model helpers that don't touch the database"""
+
+    def test_new_user_without_email_raise_error(self):
+        """Test creating new user without email raise error."""
+
+        with self.assertRaises(ValueError):
+            get_user_model().objects.create_user('', 'test123pass')
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Test generating image path."""
@@ -101,4 +108,4 @@ class ModelTests(TestCase):
         mock_uuid.return_value = uuid
         file_path = models.recipe_image_file_path(None, 'example.jpg')
 
-        self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
\ No newline at end of file
+        self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
@@ -30,27 +30,46 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients']
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, recipe):
-        """Create or get tags"""
+    def _get_or_create_objects(self, model, items):
+        """Return the user's objects named in items, creating missing ones."""
         auth_user = self.context['request'].user
-
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag
+        names = list(dict.fromkeys(item['name'] for item in items))
+        if not names:
+            return []
+
+        objs = {
+            obj.name: obj
+            for obj in model.objects.filter(user=auth_user, name__in=names)
+        }
+        missing = [name for name in names if name not in objs]
+
+        if missing:
+            # Not every backend sets primary keys on bulk_create, so read
+            # the new rows back instead of relying on the returned objects.
+            model.objects.bulk_create(
+                [model(user=auth_user, name=name) for name in missing]
             )
-            recipe.tags.add(tag_obj)
+            objs.update(
+                (obj.name, obj)
+                for obj in model.objects.filter(
+                    user=auth_user,
+                    name__in=missing
+                )
+            )
+
+        return list(objs.values())
+
+    def _get_or_create_tags(self, tags, recipe):
+        """Create or get tags"""
+        tag_objs = self._get_or_create_objects(Tag, tags)
+        if tag_objs:
+            recipe.tags.add(*tag_objs)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Handle getting or creating ingredients as needed."""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
-
+        ingredient_objs = self._get_or_create_objects(Ingredient, ingredients)
+        if ingredient_objs:
+            recipe.ingredients.add(*ingredient_objs)
 
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
@@ -1,57 +1,100 @@
 """Test recipe APIs"""
-import tempfile
+import functools
+import io
 import os
+import shutil
+import tempfile
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 from decimal import Decimal
-from rest_framework.test import APIClient
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
 from rest_framework import status
 
 from core.models import Recipe, Tag, Ingredient
-from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.serializers import RecipeDetailSerializer
+from recipe.views import RecipeViewSet
 
 RECIPES_URL = reverse('recipe:recipe-list')
 
+PRICE_DEFAULT = Decimal('3.59')
+
+recipe_list_view = RecipeViewSet.as_view({'get': 'list'})
+
+@functools.lru_cache(maxsize=None)
 def detail_url(recipe_id):
     """Return recipe detail url"""
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
+@functools.lru_cache(maxsize=None)
 def image_upload_url(recipe_id):
     """Create and return an image upload URL."""
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def list_recipes(user, params=None):
+    """Call the recipe list view directly, skipping middleware"""
+
+    request = APIRequestFactory().get(RECIPES_URL, params)
+    force_authenticate(request, user=user)
+
+    return recipe_list_view(request)
+
+
+def _make_jpeg():
+    """Encode and return a small JPEG image as bytes"""
+
+    image_file = io.BytesIO()
+    Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+
+    return image_file.getvalue()
+
+
+JPEG_BYTES = _make_jpeg()
+
+
 def create_user(**params):
     """Create and return a new user."""
     return get_user_model().objects.create_user(**params)
 
+
+RECIPE_DEFAULTS = {
+    'title': 'Sample title',
+    'description': 'Sample description',
+    'time_minutes': 5,
+    'price': 3.50,
+    'link': 'http://www.example.pdf'
+}
+
+
 def create_recipe(user, **params):
     """Create and return recipe"""
 
-    defaults = {
-        'title': 'Sample title',
-        'description': 'Sample description',
-        'time_minutes': 5,
-        'price': 3.50,
-        'link': 'http://www.example.pdf'
-    }
+    return Recipe.objects.create(user=user, **(RECIPE_DEFAULTS | params))
+
 
-    defaults.update(params)
+def create_recipes(user, n, **params):
+    """Create and return n recipes with a single INSERT"""
 
-    recipe = Recipe.objects.create(user=user,**defaults)
+    defaults = RECIPE_DEFAULTS | params
 
-    return recipe
+    return Recipe.objects.bulk_create(
+        [Recipe(user=user, **defaults) for _ in range(n)]
+    )
 
 
-class PubilcRecipeApiTests(TestCase):
+class PubilcRecipeApiTests(SimpleTestCase):
     """Tests for unauthenticated users"""
 
-    def setUp(self):
-        self.client = APIClient()
+    client_class = APIClient
 
     def test_auth_user(self):
         """Test return error for unauthenticated users """
@@ -63,47 +106,74 @@ class PubilcRecipeApiTests(TestCase):
 class PrivateRecipeApiTests(TestCase):
     """Tests for authenticated users"""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = create_user(
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(
             email='test@example.com',
             password='testpass123'
         )
+        cls.other_user = create_user(
+            email='user2@example.com',
+            password='test123'
+        )
 
+    def setUp(self):
         self.client.force_authenticate(self.user)
 
     def test_retrieve_recipe(self):
         """Test retrieve all recipe for all authenticated users"""
 
-        create_recipe(user=self.user)
-        create_recipe(user=self.user)
+        create_recipes(self.user, 2)
 
-        res = self.client.get(RECIPES_URL)
+        res = list_recipes(self.user)
 
-        recipe = Recipe.objects.all()
-        serializer = RecipeSerializer(recipe, many=True)
+        recipe_ids = Recipe.objects.values_list('id', flat=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual({r['id'] for r in res.data}, set(recipe_ids))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_retrieve_recipe_prefetches_relations(self):
+        """Test listing recipes does not query relations per recipe"""
+
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+        RecipeTag = Recipe.tags.through
+        RecipeTag.objects.bulk_create([
+            RecipeTag(recipe=recipe, tag=tag)
+            for recipe in recipes
+            for tag in (tag1, tag2)
+        ])
+        RecipeIngredient = Recipe.ingredients.through
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredient)
+            for recipe in recipes
+        ])
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 5)
+
     def test_retrieve_recipe_limited_user(self):
         """Test retrieve recipe for limited users"""
 
-        other_user = create_user(
-            email='test2@example.com',
-            password='testpass123'
-        )
-
         create_recipe(user=self.user)
-        create_recipe(user=other_user)
+        create_recipe(user=self.other_user)
 
-        res = self.client.get(RECIPES_URL)
+        res = list_recipes(self.user)
 
-        recipe = Recipe.objects.filter(user=self.user)
-        serializer = RecipeSerializer(recipe, many=True)
+        recipe_ids = Recipe.objects.filter(
+            user=self.user
+        ).values_list('id', flat=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual({r['id'] for r in res.data}, set(recipe_ids))
 
     def test_recipe_detail(self):
         """Test recipe detail"""
@@ -124,16 +194,19 @@ class PrivateRecipeApiTests(TestCase):
         payload = {
             'title': 'New sample title',
             'time_minutes': 4,
-            'price': Decimal('3.59')
+            'price': PRICE_DEFAULT
         }
 
         res = self.client.post(RECIPES_URL, payload)
-        recipe = Recipe.objects.get(id=res.data['id'])
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
-        for k,v in payload.items():
-            self.assertEqual(getattr(recipe, k), v)
-        self.assertEqual(recipe.user, self.user)
+        recipe = Recipe.objects.values('user_id', *payload).get(
+            id=res.data['id']
+        )
+        for k, v in payload.items():
+            with self.subTest(field=k):
+                self.assertEqual(recipe[k], v)
+        self.assertEqual(recipe['user_id'], self.user.id)
 
     def test_partial_update(self):
         """Test partial update of a recipe."""
@@ -149,10 +222,21 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.patch(url, payload)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        recipe.refresh_from_db()
-        self.assertEqual(recipe.title, payload['title'])
-        self.assertEqual(recipe.link, original_link)
-        self.assertEqual(recipe.user, self.user)
+        saved = Recipe.objects.values('title', 'link', 'user_id').get(
+            id=recipe.id
+        )
+        self.assertEqual(saved['title'], payload['title'])
+        self.assertEqual(saved['link'], original_link)
+        self.assertEqual(saved['user_id'], self.user.id)
+
+    def test_partial_update_skips_prefetch(self):
+        """Test updating a recipe does not prefetch its relations"""
+        recipe = create_recipe(user=self.user)
+
+        with self.assertNumQueries(4):
+            res = self.client.patch(detail_url(recipe.id), {'title': 'New'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_full_update(self):
         """Test full update of recipe."""
@@ -174,22 +258,25 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.put(url, payload)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        recipe.refresh_from_db()
+        saved = Recipe.objects.values('user_id', *payload).get(id=recipe.id)
         for k, v in payload.items():
-            self.assertEqual(getattr(recipe, k), v)
-        self.assertEqual(recipe.user, self.user)
+            with self.subTest(field=k):
+                self.assertEqual(saved[k], v)
+        self.assertEqual(saved['user_id'], self.user.id)
 
     def test_update_user_returns_error(self):
         """Test changing the recipe user results in an error."""
-        new_user = create_user(email='user2@example.com', password='test123')
         recipe = create_recipe(user=self.user)
 
-        payload = {'user': new_user.id}
+        payload = {'user': self.other_user.id}
         url = detail_url(recipe.id)
         self.client.patch(url, payload)
 
-        recipe.refresh_from_db()
-        self.assertEqual(recipe.user, self.user)
+        user_id = Recipe.objects.values_list(
+            'user_id',
+            flat=True
+        ).get(pk=recipe.id)
+        self.assertEqual(user_id, self.user.id)
 
     def test_delete_recipe(self):
         """Test deleting a recipe successful."""
@@ -203,8 +290,7 @@ class PrivateRecipeApiTests(TestCase):
 
     def test_recipe_other_users_recipe_error(self):
         """Test trying to delete another users recipe gives error."""
-        new_user = create_user(email='user2@example.com', password='test123')
-        recipe = create_recipe(user=new_user)
+        recipe = create_recipe(user=self.other_user)
 
         url = detail_url(recipe.id)
         res = self.client.delete(url)
@@ -219,7 +305,7 @@ class PrivateRecipeApiTests(TestCase):
         payload = {
             'title': 'New sample title',
             'time_minutes': 4,
-            'price': Decimal('3.59'),
+            'price': PRICE_DEFAULT,
             'tags': [{'name':'Indian'}, {'name':'Bangla'}]
         }
 
@@ -230,13 +316,13 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(recipes.count(), 1)
         recipe = recipes[0]
         self.assertEqual(recipe.tags.count(), 2)
-        for tag in payload['tags']:
-            exists = Tag.objects.filter(
-                user = self.user,
-                name = tag['name']
-            ).exists()
+        names = {tag['name'] for tag in payload['tags']}
+        existing = set(Tag.objects.filter(
+            user=self.user,
+            name__in=names
+        ).values_list('name', flat=True))
 
-            self.assertTrue(exists)
+        self.assertEqual(existing, names)
 
     def test_create_recipe_with_tag_exists(self):
         """Test create recipe with existing tags"""
@@ -246,7 +332,7 @@ class PrivateRecipeApiTests(TestCase):
         payload = {
             'title': 'New sample title',
             'time_minutes': 4,
-            'price': Decimal('3.59'),
+            'price': PRICE_DEFAULT,
             'tags': [{'name':'Indian'}, {'name':'Bangla'}]
         }
 
@@ -256,16 +342,56 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         self.assertEqual(recipes.count(), 1)
         recipe = recipes[0]
-        self.assertEqual(recipe.tags.count(), 2)
-        self.assertIn(tag_indian, recipe.tags.all())
+        tags = list(recipe.tags.all())
+        self.assertEqual(len(tags), 2)
+        self.assertIn(tag_indian, tags)
 
-        for tag in payload['tags']:
-            exists = Tag.objects.filter(
-                user=self.user,
-                name=tag['name']
-            ).exists()
+        names = {tag['name'] for tag in payload['tags']}
+        existing = set(Tag.objects.filter(
+            user=self.user,
+            name__in=names
+        ).values_list('name', flat=True))
 
-            self.assertTrue(exists)
+        self.assertEqual(existing, names)
+
+    def test_create_recipe_with_existing_tags_query_count(self):
+        """Test assigning existing tags does not query once per tag"""
+
+        names = ['Indian', 'Bangla', 'Dinner']
+        for name in names:
+            Tag.objects.create(user=self.user, name=name)
+
+        payload = {
+            'title': 'New sample title',
+            'time_minutes': 4,
+            'price': PRICE_DEFAULT,
+            'tags': [{'name': name} for name in names]
+        }
+
+        with self.assertNumQueries(5):
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['tags']), 3)
+
+    def test_create_recipe_with_new_tags_query_count(self):
+        """Test creating new tags does not query once per tag"""
+
+        names = ['Indian', 'Bangla', 'Dinner']
+
+        payload = {
+            'title': 'New sample title',
+            'time_minutes': 4,
+            'price': PRICE_DEFAULT,
+            'tags': [{'name': name} for name in names]
+        }
+
+        with self.assertNumQueries(7):
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['tags']), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
 
     def test_create_tag_in_recipe(self):
         """Test create tag while updating recipe"""
@@ -298,8 +424,8 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(lunch_tag, recipe.tags.all())
-        self.assertNotIn(tag_breakfast, recipe.tags.all())
+        tag_ids = set(recipe.tags.values_list('id', flat=True))
+        self.assertEqual(tag_ids, {lunch_tag.id})
 
     def test_clear_tag(self):
         """Test clearing a recipes tag"""
@@ -315,7 +441,7 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(recipe.tags.count(), 0)
+        self.assertFalse(recipe.tags.exists())
 
     def test_create_recipe_with_new_ingredients(self):
         """Test creating a recipe with new ingredients."""
@@ -356,8 +482,9 @@ class PrivateRecipeApiTests(TestCase):
 
         self.assertEqual(recipes.count(), 1)
         recipe = recipes[0]
-        self.assertEqual(recipe.ingredients.count(), 2)
-        self.assertIn(ingredient, recipe.ingredients.all())
+        ingredient_ids = set(recipe.ingredients.values_list('id', flat=True))
+        self.assertEqual(len(ingredient_ids), 2)
+        self.assertIn(ingredient.id, ingredient_ids)
         for ingredient in payload['ingredients']:
             exists = recipe.ingredients.filter(
                 name=ingredient['name'],
@@ -390,8 +517,8 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(ingredient2, recipe.ingredients.all())
-        self.assertNotIn(ingredient1, recipe.ingredients.all())
+        ingredient_ids = set(recipe.ingredients.values_list('id', flat=True))
+        self.assertEqual(ingredient_ids, {ingredient2.id})
 
     def test_clear_recipe_ingredients(self):
         """Test clearing a recipes ingredients."""
@@ -404,7 +531,7 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(recipe.ingredients.count(), 0)
+        self.assertFalse(recipe.ingredients.exists())
 
     def test_filter_by_tags(self):
         """Test filter recipe with tags ids"""
@@ -415,21 +542,19 @@ class PrivateRecipeApiTests(TestCase):
         tg1 = Tag.objects.create(user=self.user, name="Vegan")
         tg2 = Tag.objects.create(user=self.user, name="Diet")
 
-        r1.tags.add(tg1)
-        r2.tags.add(tg2)
-        r3 = create_recipe(user=self.user, title="Sandwich")
+        RecipeTag = Recipe.tags.through
+        RecipeTag.objects.bulk_create([
+            RecipeTag(recipe=r1, tag=tg1),
+            RecipeTag(recipe=r2, tag=tg2),
+        ])
+        create_recipe(user=self.user, title="Sandwich")
 
         params = {'tags': f'{tg1.id},{tg2.id}'}
 
-        res = self.client.get(RECIPES_URL, params)
+        with self.assertNumQueries(3):
+            res = list_recipes(self.user, params)
 
-        s1 = RecipeSerializer(r1)
-        s2 = RecipeSerializer(r2)
-        s3 = RecipeSerializer(r3)
-
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertCountEqual([r['id'] for r in res.data], [r1.id, r2.id])
 
     def test_filter_by_ingredients(self):
         """Test filter recipe with ingredients ids"""
@@ -440,46 +565,57 @@ class PrivateRecipeApiTests(TestCase):
         in1 = Ingredient.objects.create(user=self.user, name="Salt")
         in2 = Ingredient.objects.create(user=self.user, name="Rice")
 
-        r1.ingredients.add(in1)
-        r2.ingredients.add(in2)
-        r3 = create_recipe(user=self.user, title="Sandwich")
+        RecipeIngredient = Recipe.ingredients.through
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=r1, ingredient=in1),
+            RecipeIngredient(recipe=r2, ingredient=in2),
+        ])
+        create_recipe(user=self.user, title="Sandwich")
 
         params = {'ingredients': f'{in1.id},{in2.id}'}
 
-        res = self.client.get(RECIPES_URL, params)
-
-        s1 = RecipeSerializer(r1)
-        s2 = RecipeSerializer(r2)
-        s3 = RecipeSerializer(r3)
+        with self.assertNumQueries(3):
+            res = list_recipes(self.user, params)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertCountEqual([r['id'] for r in res.data], [r1.id, r2.id])
 
 class ImageUploadTests(TestCase):
     """Tests for the image upload API."""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
+    client_class = APIClient
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        cls.addClassCleanup(media_override.disable)
+
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
             'user@example.com',
             'password123',
         )
+
+    def setUp(self):
         self.client.force_authenticate(self.user)
         self.recipe = create_recipe(user=self.user)
 
-    def tearDown(self):
-        self.recipe.image.delete()
-
     def test_upload_image(self):
         """Test uploading an image to a recipe."""
         url = image_upload_url(self.recipe.id)
-        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
-            img = Image.new('RGB', (10, 10))
-            img.save(image_file, format='JPEG')
-            image_file.seek(0)
-            payload = {'image': image_file}
-            res = self.client.post(url, payload, format='multipart')
+        image_file = SimpleUploadedFile(
+            'image.jpg',
+            JPEG_BYTES,
+            content_type='image/jpeg',
+        )
+        payload = {'image': image_file}
+        res = self.client.post(url, payload, format='multipart')
 
         self.recipe.refresh_from_db()
         self.assertEqual(res.status_code, status.HTTP_200_OK)
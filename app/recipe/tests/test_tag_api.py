@@ -1,8 +1,9 @@
 """Test tag model"""
+import functools
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -12,6 +13,7 @@ from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
 
+@functools.lru_cache(maxsize=None)
 def tag_detail_url(tag_id):
     """"Return tag detail url"""
 
@@ -35,14 +37,14 @@ def create_tag(user, **params):
     return tag
 
 
-class PublicApiTests(TestCase):
+class PublicApiTests(SimpleTestCase):
     """Test for unauthenticated users"""
 
+    client_class = APIClient
+
     def test_retrieve_tags(self):
         """Test retrieve all tags for unauthenticated user and get error"""
 
-        self.client = APIClient()
-
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -50,9 +52,13 @@ class PublicApiTests(TestCase):
 class PrivateApiTests(TestCase):
     """Test for authenticated users"""
 
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
     def setUp(self):
-        self.client = APIClient()
-        self.user = create_user()
         self.client.force_authenticate(self.user)
 
     def test_retrieve_all_tags(self):
@@ -125,10 +131,9 @@ class PrivateApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        s1 = TagSerializer(tag1)
-        s2 = TagSerializer(tag2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        s1, s2 = TagSerializer([tag1, tag2], many=True).data
+        self.assertIn(s1, res.data)
+        self.assertNotIn(s2, res.data)
 
     def test_filtered_tags_unique(self):
         """Test filtered tags returns a unique list."""
@@ -56,9 +56,17 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ingredient_ids = self._params_to_int(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_ids)
 
-        return queryset.filter(
-            user=self.request.user
-        ).distinct()
+        if tags or ingredients:
+            # Only the many-to-many joins above can produce duplicate rows.
+            queryset = queryset.distinct()
+
+        queryset = queryset.filter(user=self.request.user)
+
+        # Writes and image uploads would throw the prefetched rows away.
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.prefetch_related('tags', 'ingredients')
+
+        return queryset
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
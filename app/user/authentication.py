@@ -0,0 +1,121 @@
+"""Authentication classes for the user API"""
+
+import copy
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework.authentication import TokenAuthentication
+
+
+def _auth_cache_key(email, password):
+    """Return the cache key for a set of login credentials"""
+
+    digest = salted_hmac(
+        'user.auth_cache',
+        f'{email}:{password}',
+        algorithm='sha256'
+    ).hexdigest()
+
+    return f'user:auth:{digest}'
+
+
+def _password_fingerprint(password_hash):
+    """Return a keyed digest of a password hash, safe to keep in the cache"""
+
+    return salted_hmac(
+        'user.auth_cache.password',
+        password_hash,
+        algorithm='sha256'
+    ).hexdigest()
+
+
+def authenticate_cached(request, email, password):
+    """Authenticate the user, reusing recent successful logins if enabled"""
+
+    if not settings.AUTH_CACHE_ENABLED:
+        return authenticate(
+            request=request,
+            username=email,
+            password=password
+        )
+
+    key = _auth_cache_key(email, password)
+    cached = cache.get(key)
+
+    if cached is not None:
+        user_id, fingerprint = cached
+        user = get_user_model().objects.filter(
+            pk=user_id,
+            email=email,
+            is_active=True
+        ).first()
+
+        # A changed password hash means the cached login is stale.
+        if user is not None and constant_time_compare(
+            _password_fingerprint(user.password),
+            fingerprint
+        ):
+            return user
+
+    user = authenticate(
+        request=request,
+        username=email,
+        password=password
+    )
+
+    if user is not None:
+        cache.set(
+            key,
+            (user.pk, _password_fingerprint(user.password)),
+            settings.AUTH_CACHE_TIMEOUT
+        )
+
+    return user
+
+
+def token_cache_key(key):
+    """Return the cache key for an auth token"""
+
+    digest = hashlib.sha256(key.encode()).hexdigest()
+
+    return f'user:token:{digest}'
+
+
+def _cacheable_credentials(user, token):
+    """Return copies of user and token without the user's password hash"""
+
+    user = copy.copy(user)
+    # Deferring the field keeps the hash out of the cache; it is loaded
+    # from the database again if anything reads it.
+    del user.password
+
+    token = copy.copy(token)
+    token.user = user
+
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches token lookups for a short time"""
+
+    def authenticate_credentials(self, key):
+        """Return the cached (user, token) pair, looking it up on a miss"""
+
+        if not settings.TOKEN_CACHE_ENABLED:
+            return super().authenticate_credentials(key)
+
+        cache_key = token_cache_key(key)
+        credentials = cache.get(cache_key)
+
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            cache.set(
+                cache_key,
+                _cacheable_credentials(*credentials),
+                settings.TOKEN_CACHE_TIMEOUT
+            )
+
+        return credentials
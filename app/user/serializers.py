@@ -1,10 +1,12 @@
 """Serializers for the user API View"""
 
-from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth import get_user_model
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
 from core.models import User
+from user.authentication import authenticate_cached
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object"""
@@ -24,13 +26,19 @@ class UserSerializer(serializers.ModelSerializer):
         """Update and return user"""
 
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
+
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+
+        update_fields = list(validated_data)
 
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
+            update_fields.append('password')
+
+        instance.save(update_fields=update_fields)
 
-        return user
+        return instance
 
 class AuthTokenSerializer(serializers.Serializer):
     """Serializer for the user auth token"""
@@ -44,9 +52,9 @@ class AuthTokenSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = authenticate(
+        user = authenticate_cached(
             request=self.context.get('request'),
-            username=email,
+            email=email,
             password=password
         )
 
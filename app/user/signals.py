@@ -0,0 +1,29 @@
+"""Signal receivers keeping the user API caches in sync"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache_key
+
+
+@receiver(post_delete, sender=Token)
+def clear_deleted_token(sender, instance, **kwargs):
+    """Drop the cached lookup of a deleted token"""
+
+    if settings.TOKEN_CACHE_ENABLED:
+        cache.delete(token_cache_key(instance.key))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def clear_user_tokens(sender, instance, created, **kwargs):
+    """Drop cached token lookups holding a stale copy of the user"""
+
+    if settings.TOKEN_CACHE_ENABLED and not created:
+        keys = Token.objects.filter(user=instance).values_list(
+            'key',
+            flat=True
+        )
+        cache.delete_many([token_cache_key(key) for key in keys])
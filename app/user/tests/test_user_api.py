@@ -1,53 +1,83 @@
 """Test for the user API"""
 
-from django.test import TestCase
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
-from django.contrib.auth import get_user_model
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from user.authentication import token_cache_key
+from user.views import UserApiView, CreateUserTokenApiView, ManageUserView
+
+User = get_user_model()
 
 def create_user(**params):
     """Create and return new user"""
-    return get_user_model().objects.create_user(**params)
+    return User.objects.create_user(**params)
+
+
+def call_view(view, method, data=None, user=None):
+    """Call a view directly, skipping middleware and URL resolving"""
+
+    request = getattr(APIRequestFactory(), method)('/', data)
+    if user is not None:
+        force_authenticate(request, user=user)
+
+    return view(request)
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
 
+USER_DETAILS = {
+    'name': 'Test Name',
+    'email': 'test@example.com',
+    'password': 'testpass123'
+}
+PAYLOAD_LOGIN = {
+    'email': USER_DETAILS['email'],
+    'password': USER_DETAILS['password']
+}
+
+create_user_view = UserApiView.as_view()
+token_view = CreateUserTokenApiView.as_view()
+me_view = ManageUserView.as_view()
+
 class PublicUserApiTests(TestCase):
     """Test the public features of user api"""
 
-    def setUp(self):
-        self.client = APIClient()
+    client_class = APIClient
 
     def test_create_user_success(self):
         """Test create new user successfully"""
 
-        payload = {
-            'email':'test@example.com',
-            'password':'testpass123',
-            'name':'Test Name'
-        }
+        payload = USER_DETAILS
 
         res = self.client.post(CREATE_USER_URL, payload)
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
-        user = get_user_model().objects.get(email=payload['email'])
+        user = User.objects.get(email=payload['email'])
         self.assertTrue(user.check_password(payload['password']))
         self.assertNotIn('password', res.data)
 
     def test_user_with_email_exists_error(self):
         """Test error returned if user with email exists and get error"""
 
-        payload = {
-            'email':'test@example.com',
-            'password':'testpass123',
-            'name':'Test Name'
-        }
+        payload = USER_DETAILS
 
         create_user(**payload)
 
-        res = self.client.post(CREATE_USER_URL, payload)
+        res = call_view(create_user_view, 'post', payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_password_too_short_error(self):
@@ -59,26 +89,17 @@ class PublicUserApiTests(TestCase):
             'name':'Test Name'
         }
 
-        res = self.client.post(CREATE_USER_URL, payload)
+        res = call_view(create_user_view, 'post', payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
-        user_exists = get_user_model().objects.filter(email=payload['email']).exists()
+        user_exists = User.objects.filter(email=payload['email']).exists()
         self.assertFalse(user_exists)
 
     def test_create_user_token_success(self):
         """Test generate token for new user"""
 
-        user_details = {
-            'name': 'Test Name',
-            'email': 'test@example.com',
-            'password': 'testpass123'
-        }
-
-        create_user(**user_details)
+        create_user(**USER_DETAILS)
 
-        payload = {
-            'email': user_details['email'],
-            'password': user_details['password']
-        }
+        payload = PAYLOAD_LOGIN
 
         res = self.client.post(TOKEN_URL, payload)
         self.assertIn('token', res.data)
@@ -87,20 +108,14 @@ class PublicUserApiTests(TestCase):
     def test_create_token_bad_credentials(self):
         """Test returns error if credential is invalid"""
 
-        user_details = {
-            'name': 'Test Name',
-            'email': 'test@example.com',
-            'password': 'testpass123'
-        }
-
-        create_user(**user_details)
+        create_user(**USER_DETAILS)
 
         payload = {
-            'email': user_details['email'],
+            'email': USER_DETAILS['email'],
             'password': 'test123pass'
         }
 
-        res = self.client.post(TOKEN_URL, payload)
+        res = call_view(token_view, 'post', payload)
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
@@ -112,50 +127,108 @@ class PublicUserApiTests(TestCase):
             'password': 'test123pass'
         }
 
-        res = self.client.post(TOKEN_URL, payload)
+        res = call_view(token_view, 'post', payload)
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_create_token_blank_password(self):
         """Test returns error if password was not provided by user"""
 
-        user_details = {
-            'name': 'Test Name',
-            'email': 'test@example.com',
-            'password': 'testpass123'
-        }
-
-        create_user(**user_details)
+        create_user(**USER_DETAILS)
 
         payload = {
-            'email': user_details['email'],
+            'email': USER_DETAILS['email'],
             'password': ''
         }
 
-        res = self.client.post(TOKEN_URL, payload)
+        res = call_view(token_view, 'post', payload)
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_create_token_blank_email(self):
         """Test returns error if email was not provided by user"""
 
-        user_details = {
-            'name': 'Test Name',
-            'email': 'test@example.com',
-            'password': 'testpass123'
-        }
-
-        create_user(**user_details)
+        create_user(**USER_DETAILS)
 
         payload = {
             'email': '',
-            'password': 'testpass123'
+            'password': USER_DETAILS['password']
         }
 
+        res = call_view(token_view, 'post', payload)
+        self.assertNotIn('token', res.data)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(AUTH_CACHE_ENABLED=True)
+    def test_create_token_reuses_cached_login(self):
+        """Test repeat logins skip password authentication when cached"""
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        create_user(**USER_DETAILS)
+
+        payload = PAYLOAD_LOGIN
+
+        with patch(
+            'user.authentication.authenticate',
+            wraps=authenticate
+        ) as mock_authenticate:
+            res1 = self.client.post(TOKEN_URL, payload)
+            res2 = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(mock_authenticate.call_count, 1)
+        self.assertEqual(res2.status_code, status.HTTP_200_OK)
+        self.assertEqual(res1.data['token'], res2.data['token'])
+
+    @override_settings(AUTH_CACHE_ENABLED=True)
+    def test_create_token_cached_login_after_password_change(self):
+        """Test a cached login is not reused once the password changes"""
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        user = create_user(**USER_DETAILS)
+
+        payload = PAYLOAD_LOGIN
+
+        res = self.client.post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        user.set_password('newpass123')
+        user.save()
+
+        res = self.client.post(TOKEN_URL, payload)
+        self.assertNotIn('token', res.data)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(AUTH_CACHE_ENABLED=True)
+    def test_create_token_cached_login_after_email_change(self):
+        """Test a cached login is not reused once the email changes"""
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        user = create_user(**USER_DETAILS)
+
+        payload = PAYLOAD_LOGIN
+
+        res = self.client.post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        user.email = 'new@example.com'
+        user.save()
+
         res = self.client.post(TOKEN_URL, payload)
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+
+class PublicUserApiNoDbTests(SimpleTestCase):
+    """Test public features of user api that don't touch the database"""
+
+    client_class = APIClient
+
     def test_retrieve_user_unauthorized(self):
         """Test authentication is required for users"""
 
@@ -166,20 +239,19 @@ class PublicUserApiTests(TestCase):
 class PrivateUserApiTests(TestCase):
     """Test API requests that require authentication."""
 
-    def setUp(self):
-        self.user = create_user(
-            name='Test Name',
-            email='test@example.com',
-            password='testpass123'
-        )
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(**USER_DETAILS)
 
-        self.client = APIClient()
+    def setUp(self):
         self.client.force_authenticate(user=self.user)
 
     def test_retrieve_profile_success(self):
         """Test retrieving profile for logged in user."""
 
-        res = self.client.get(ME_URL)
+        res = call_view(me_view, 'get', user=self.user)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, {
@@ -202,9 +274,113 @@ class PrivateUserApiTests(TestCase):
             'password': 'newpass123'
         }
 
-        res = self.client.patch(ME_URL, payload)
+        res = call_view(me_view, 'patch', payload, user=self.user)
+
+        name, password = User.objects.filter(
+            pk=self.user.pk
+        ).values_list('name', 'password').first()
+        self.assertEqual(name, payload['name'])
+        self.assertTrue(check_password(payload['password'], password))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_profile_return_minimal(self):
+        """Test profile updates skip the body when the client prefers it"""
+
+        payload = {'name': 'New Name'}
+
+        res = self.client.patch(ME_URL, payload, HTTP_PREFER='return=minimal')
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(res.content)
+        self.assertEqual(res['Preference-Applied'], 'return=minimal')
+        name = User.objects.values_list('name', flat=True).get(
+            pk=self.user.pk
+        )
+        self.assertEqual(name, payload['name'])
+
+    def test_update_profile_return_minimal_with_parameters(self):
+        """Test the minimal preference matches case-insensitively"""
+
+        res = self.client.patch(
+            ME_URL,
+            {'name': 'New Name'},
+            HTTP_PREFER='respond-async, Return=Minimal; foo="bar"'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
 
-        self.user.refresh_from_db()
-        self.assertEqual(self.user.name, payload['name'])
-        self.assertTrue(self.user.check_password(payload['password']))
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
\ No newline at end of file
+class TokenCacheTests(TestCase):
+    """Test caching token lookups on the manage user endpoint"""
+
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(**USER_DETAILS)
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_retrieve_profile_token_not_cached_by_default(self):
+        """Test token lookups hit the database unless caching is enabled"""
+
+        self.client.get(ME_URL)
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(TOKEN_CACHE_ENABLED=True)
+    def test_retrieve_profile_caches_token_lookup(self):
+        """Test repeat token requests skip the token query"""
+
+        self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(TOKEN_CACHE_ENABLED=True)
+    def test_cached_token_excludes_password_hash(self):
+        """Test cached token lookups do not store the password hash"""
+
+        self.client.get(ME_URL)
+
+        user, token = cache.get(token_cache_key(self.token.key))
+        self.assertIn('password', user.get_deferred_fields())
+        self.assertIs(token.user, user)
+
+    @override_settings(TOKEN_CACHE_ENABLED=True)
+    def test_update_profile_clears_cached_token(self):
+        """Test profile changes are visible to cached token requests"""
+
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New Name'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    @override_settings(TOKEN_CACHE_ENABLED=True)
+    def test_deleted_token_clears_cached_token(self):
+        """Test a deleted token is rejected even after being cached"""
+
+        self.client.get(ME_URL)
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_CACHE_ENABLED=True)
+    def test_deactivated_user_clears_cached_token(self):
+        """Test a deactivated user's cached token is rejected"""
+
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,11 +1,11 @@
 """Views of the user API"""
 
-from django.shortcuts import render
-
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework.settings import api_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 
+from .authentication import CachedTokenAuthentication
 from .serializers import UserSerializer, AuthTokenSerializer
 
 # Create your views here.
@@ -13,20 +13,57 @@ class UserApiView(generics.CreateAPIView):
     """Create a new user in the system"""
 
     serializer_class = UserSerializer
+    renderer_classes = [JSONRenderer]
+    throttle_classes = []
 
 class CreateUserTokenApiView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
-
-    # renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    renderer_classes = [JSONRenderer]
+    throttle_classes = []
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage authenticated user"""
 
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [JSONRenderer]
+    throttle_classes = []
 
     def get_object(self):
         """Retrieve and return the authenticated user"""
 
-        return self.request.user
\ No newline at end of file
+        return self.request.user
+
+    def update(self, request, *args, **kwargs):
+        """Update the user, skipping the body if the client asks for it"""
+
+        if not _prefers_minimal(request):
+            return super().update(request, *args, **kwargs)
+
+        serializer = self.get_serializer(
+            self.get_object(),
+            data=request.data,
+            partial=kwargs.pop('partial', False)
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+
+        return Response(
+            status=status.HTTP_204_NO_CONTENT,
+            headers={'Preference-Applied': 'return=minimal'}
+        )
+
+
+def _prefers_minimal(request):
+    """Return whether the request sends the Prefer: return=minimal header"""
+
+    for preference in request.headers.get('Prefer', '').split(','):
+        token = preference.split(';', 1)[0]
+        name, _, value = token.partition('=')
+
+        if (name.strip().lower() == 'return'
+                and value.strip().strip('"').lower() == 'minimal'):
+            return True
+
+    return False